@@ -1,7 +1,133 @@
+import logging
 import os
+import threading
+import time
+from contextlib import contextmanager
+
 import psycopg2
+from psycopg2 import errorcodes
+from psycopg2.pool import ThreadedConnectionPool
+
+logger = logging.getLogger(__name__)
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "2"))
+# sync endpoints run on anyio's worker threads (40 by default), so size the pool to match
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "40"))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _get_pool() -> ThreadedConnectionPool:
+    # created lazily so the gateway can start before postgres is reachable
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadedConnectionPool(DB_POOL_MIN, DB_POOL_MAX, DATABASE_URL)
+    return _pool
 
+@contextmanager
 def db_conn():
-    return psycopg2.connect(DATABASE_URL)
\ No newline at end of file
+    """
+    Borrow a pooled connection. Commits on success, rolls back on error
+    (same as psycopg2's `with conn:`), then returns it to the pool.
+    """
+    pool = _get_pool()
+    conn = pool.getconn()
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        if not conn.closed:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                pass
+        raise
+    finally:
+        # drop connections that died mid-request instead of handing them out again
+        pool.putconn(conn, close=bool(conn.closed))
+
+# indexes for the gateway's per-driver / per-client / admin listings and the
+# per-order event trail (tables themselves are created outside this repo)
+INDEXES = (
+    ("orders_driver_created_idx", "orders (assigned_driver_id, created_at DESC)"),
+    ("orders_driver_status_idx", "orders (assigned_driver_id, status, created_at)"),
+    ("orders_client_created_idx", "orders (client_id, created_at DESC)"),
+    ("orders_created_idx", "orders (created_at DESC)"),
+    ("order_events_order_created_idx", "order_events (order_id, created_at)"),
+)
+INDEX_RETRY_MAX_SEC = 60
+
+def _create_indexes(pending: list) -> list:
+    """
+    CONCURRENTLY so the build never blocks writes to orders; it can't run in a
+    transaction, so this uses its own autocommit connection instead of the pool.
+    Returns the (name, target) pairs that still need creating.
+    """
+    conn = psycopg2.connect(DATABASE_URL)
+    conn.autocommit = True
+    failed = []
+    try:
+        for name, target in pending:
+            try:
+                with conn.cursor() as cur:
+                    # an interrupted build (restart, killed backend) leaves an
+                    # INVALID index that IF NOT EXISTS counts as existing. Drop
+                    # it and rebuild on the next pass, unless another replica
+                    # is still building it, in which case just check again later.
+                    cur.execute(
+                        """
+                        SELECT i.indisvalid,
+                               EXISTS (SELECT 1 FROM pg_stat_progress_create_index p
+                                       WHERE p.index_relid = i.indexrelid)
+                        FROM pg_index i
+                        JOIN pg_class c ON c.oid = i.indexrelid
+                        WHERE c.relname = %s AND pg_table_is_visible(c.oid)
+                        """,
+                        (name,),
+                    )
+                    row = cur.fetchone()
+                    if row and not row[0]:
+                        if not row[1]:
+                            logger.warning("index %s is invalid, rebuilding", name)
+                            cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+                        failed.append((name, target))
+                        continue
+                    cur.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {target}")
+            except psycopg2.Error as e:
+                logger.warning("index %s not created yet: %s", name, e)
+                failed.append((name, target))
+                if e.pgcode in (errorcodes.UNIQUE_VIOLATION, errorcodes.DUPLICATE_TABLE):
+                    # another replica is building the same index; leave it alone
+                    continue
+                # a failed concurrent build leaves an INVALID index behind that
+                # IF NOT EXISTS would skip forever; drop it so the retry rebuilds
+                try:
+                    with conn.cursor() as cur:
+                        cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+                except psycopg2.Error:
+                    pass
+    finally:
+        conn.close()
+    return failed
+
+def _ensure_indexes_loop():
+    # postgres may not be up (or the tables not created) when the gateway
+    # boots, so keep retrying with backoff until every index exists
+    pending = list(INDEXES)
+    delay = 2
+    while True:
+        try:
+            pending = _create_indexes(pending)
+        except psycopg2.Error as e:
+            logger.warning("index setup: database not reachable: %s", e)
+        if not pending:
+            return
+        time.sleep(delay)
+        delay = min(delay * 2, INDEX_RETRY_MAX_SEC)
+
+def ensure_indexes():
+    # background thread: startup and request handling never wait on index builds
+    threading.Thread(target=_ensure_indexes_loop, name="ensure-indexes", daemon=True).start()
@@ -1,13 +1,24 @@
+import time
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 
 from app.config import SECRET_KEY, ALGORITHM
+from app.utils.cache import TTLCache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+# token -> user; portals poll with the same token every few seconds
+TOKEN_CACHE_TTL = 30
+_token_cache = TTLCache(ttl=TOKEN_CACHE_TTL)
+
 
 def get_current_user(token: str = Depends(oauth2_scheme)):
+    hit = _token_cache.get(token)
+    if hit is not None:
+        return hit
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         client_id = payload.get("sub")
@@ -17,10 +28,16 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
         if not client_id or not role:
             raise HTTPException(status_code=401, detail="Invalid token")
 
-        return {"client_id": client_id, "role": role, "email": email}
+        user = {"client_id": client_id, "role": role, "email": email}
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+    # never serve a cached token past its own exp
+    exp = payload.get("exp")
+    ttl = min(TOKEN_CACHE_TTL, exp - time.time()) if exp else TOKEN_CACHE_TTL
+    _token_cache.set(token, user, ttl=ttl)
+    return user
+
 
 def require_roles(*allowed_roles: str):
     def _guard(user=Depends(get_current_user)):
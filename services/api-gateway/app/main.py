@@ -1,11 +1,22 @@
-import json
-from typing import Dict, List
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+import orjson
+
+from fastapi import FastAPI, Response, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 
-from app.db import db_conn
+from app.db import db_conn, ensure_indexes
+from app.realtime import (
+    subscribers,
+    driver_subscribers,
+    subscribe,
+    unsubscribe,
+    push_to_order,
+    push_to_driver,
+)
 
 # Routers
 from app.routers.auth import router as auth_router
@@ -16,7 +27,17 @@ from app.routers.internal_wms import router as internal_wms_router
 from app.routers.driver import router as driver_router
 from app.routers.admin import router as admin_router  # ensure file exists
 
-app = FastAPI(title="SwiftLogistics API Gateway")  # ✅ MUST be before any @app.*
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # index builds retry in a background thread; startup doesn't wait on them
+    ensure_indexes()
+    yield
+
+app = FastAPI(
+    title="SwiftLogistics API Gateway",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
+)  # ✅ MUST be before any @app.*
 
 # ---------------- Routers ----------------
 app.include_router(auth_router)
@@ -36,82 +57,65 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# ---------------- Helpers ----------------
-def add_event(order_id: str, event_type: str, details: dict | None = None):
-    details = details or {}
-    with db_conn() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                "INSERT INTO order_events(order_id, event_type, details) VALUES (%s,%s,%s::jsonb)",
-                (order_id, event_type, json.dumps(details)),
-            )
-        conn.commit()
-
 # ---------------- WebSocket ----------------
-subscribers: Dict[str, List[WebSocket]] = {}
-
 @app.websocket("/ws/orders/{order_id}")
 async def ws_order(websocket: WebSocket, order_id: str):
     await websocket.accept()
-    subscribers.setdefault(order_id, []).append(websocket)
+    subscribe(subscribers, order_id, websocket)
     try:
         while True:
             await websocket.receive_text()
     except WebSocketDisconnect:
         pass
     finally:
-        if order_id in subscribers and websocket in subscribers[order_id]:
-            subscribers[order_id].remove(websocket)
+        unsubscribe(subscribers, order_id, websocket)
 
 # ---------------- Driver WebSocket ----------------
-driver_subscribers: Dict[str, List[WebSocket]] = {}
-
 @app.websocket("/ws/driver/{driver_id}")
 async def ws_driver(websocket: WebSocket, driver_id: str):
     await websocket.accept()
-    driver_subscribers.setdefault(driver_id, []).append(websocket)
+    subscribe(driver_subscribers, driver_id, websocket)
     try:
         while True:
             await websocket.receive_text()
     except WebSocketDisconnect:
         pass
     finally:
-        if driver_id in driver_subscribers and websocket in driver_subscribers[driver_id]:
-            driver_subscribers[driver_id].remove(websocket)
+        unsubscribe(driver_subscribers, driver_id, websocket)
 # ---------------- Internal status update ----------------
 class StatusUpdate(BaseModel):
     status: str
 
-@app.post("/internal/orders/{order_id}/status")
-async def internal_status(order_id: str, body: StatusUpdate):
+def save_status(order_id: str, status: str):
+    # status + its STATUS_UPDATE event in one statement: one round trip, one commit
     with db_conn() as conn:
         with conn.cursor() as cur:
             cur.execute(
-                "UPDATE orders SET status=%s, updated_at=NOW() WHERE id=%s",
-                (body.status, order_id),
+                """
+                WITH u AS (
+                    UPDATE orders SET status=%s, updated_at=NOW() WHERE id=%s
+                )
+                INSERT INTO order_events(order_id, event_type, details)
+                VALUES (%s, 'STATUS_UPDATE', %s::jsonb)
+                """,
+                (status, order_id, order_id, orjson.dumps({"status": status}).decode()),
             )
-            conn.commit()
-
-    add_event(order_id, "STATUS_UPDATE", {"status": body.status})
-
-    if order_id in subscribers:
-        dead = []
-        for ws in subscribers[order_id]:
-            try:
-                await ws.send_text(body.status)
-            except Exception:
-                dead.append(ws)
-        for ws in dead:
-            try:
-                subscribers[order_id].remove(ws)
-            except ValueError:
-                pass
+
+@app.post("/internal/orders/{order_id}/status")
+async def internal_status(order_id: str, body: StatusUpdate):
+    # psycopg2 blocks, so keep it off the event loop the WebSockets run on
+    await run_in_threadpool(save_status, order_id, body.status)
+
+    await push_to_order(order_id, body.status)
 
     return {"ok": True}
 
+# constant body -> encode once, not per probe
+_HEALTH_BODY = b'{"status":"ok"}'
+
 @app.get("/health")
 def health():
-    return {"status": "ok"}
+    return Response(content=_HEALTH_BODY, media_type="application/json")
 
 
 class DriverNotify(BaseModel):
@@ -128,16 +132,5 @@ async def internal_notify_driver(driver_id: str, body: DriverNotify):
         "message": body.message,
         "payload": body.payload or {},
     }
-    dead = []
-    if driver_id in driver_subscribers:
-        for ws in driver_subscribers[driver_id]:
-            try:
-                await ws.send_text(json.dumps(msg))
-            except Exception:
-                dead.append(ws)
-        for ws in dead:
-            try:
-                driver_subscribers[driver_id].remove(ws)
-            except ValueError:
-                pass
+    await push_to_driver(driver_id, msg)
     return {"ok": True}
\ No newline at end of file
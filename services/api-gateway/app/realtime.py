@@ -0,0 +1,43 @@
+# app/realtime.py
+import asyncio
+from typing import Awaitable, Callable, Dict, Set
+
+import orjson
+from fastapi import WebSocket
+
+# in-process WebSocket registries (per gateway process)
+subscribers: Dict[str, Set[WebSocket]] = {}
+driver_subscribers: Dict[str, Set[WebSocket]] = {}
+
+def subscribe(registry: Dict[str, Set[WebSocket]], key: str, ws: WebSocket):
+    registry.setdefault(key, set()).add(ws)
+
+def unsubscribe(registry: Dict[str, Set[WebSocket]], key: str, ws: WebSocket):
+    subs = registry.get(key)
+    if subs is None:
+        return
+    subs.discard(ws)
+    if not subs:
+        # don't keep an empty entry per order/driver ever seen
+        del registry[key]
+
+async def _broadcast(subs: Set[WebSocket], send: Callable[[WebSocket], Awaitable[None]]):
+    # send to every socket concurrently so one slow client doesn't hold up
+    # the rest; sockets whose send failed are dropped from the registry
+    targets = list(subs)
+    results = await asyncio.gather(*(send(ws) for ws in targets), return_exceptions=True)
+    for ws, r in zip(targets, results):
+        if isinstance(r, Exception):
+            subs.discard(ws)
+
+async def push_to_order(order_id: str, status: str):
+    subs = subscribers.get(order_id)
+    if subs:
+        await _broadcast(subs, lambda ws: ws.send_text(status))
+
+async def push_to_driver(driver_id: str, msg: dict):
+    subs = driver_subscribers.get(driver_id)
+    if subs:
+        # encode once for all of this driver's sockets
+        text = orjson.dumps(msg).decode()
+        await _broadcast(subs, lambda ws: ws.send_text(text))
@@ -8,23 +8,19 @@ router = APIRouter(prefix="/admin", tags=["admin"])
 def stats(user=Depends(require_roles("admin"))):
     with db_conn() as conn:
         with conn.cursor() as cur:
-            cur.execute("SELECT COUNT(*) FROM orders")
-            total = cur.fetchone()[0]
-
-            cur.execute("SELECT COUNT(*) FROM orders WHERE status='NEW'")
-            new = cur.fetchone()[0]
-
-            cur.execute("SELECT COUNT(*) FROM orders WHERE status='READY_FOR_DRIVER'")
-            ready = cur.fetchone()[0]
-
-            cur.execute("SELECT COUNT(*) FROM orders WHERE status='DELIVERED'")
-            delivered = cur.fetchone()[0]
-
-            cur.execute("SELECT COUNT(*) FROM orders WHERE status='FAILED'")
-            failed = cur.fetchone()[0]
-
-            cur.execute("SELECT COUNT(*) FROM orders WHERE status='DLQ'")
-            dlq = cur.fetchone()[0]
+            # one scan of orders for every bucket
+            cur.execute(
+                """
+                SELECT COUNT(*),
+                       COUNT(*) FILTER (WHERE status='NEW'),
+                       COUNT(*) FILTER (WHERE status='READY_FOR_DRIVER'),
+                       COUNT(*) FILTER (WHERE status='DELIVERED'),
+                       COUNT(*) FILTER (WHERE status='FAILED'),
+                       COUNT(*) FILTER (WHERE status='DLQ')
+                FROM orders
+                """
+            )
+            total, new, ready, delivered, failed, dlq = cur.fetchone()
 
     return {"total": total, "new": new, "ready_for_driver": ready, "delivered": delivered, "failed": failed, "dlq": dlq}
 
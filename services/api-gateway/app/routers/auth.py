@@ -1,10 +1,13 @@
+import logging
+
 from fastapi import APIRouter, HTTPException, Depends
 from app.db import db_conn
 from app.schemas import RegisterReq, LoginReq, TokenOut
-from app.security import hash_password, verify_password, create_access_token
+from app.security import hash_password, verify_password, password_needs_rehash, create_access_token
 from app.deps import get_current_user
 
 router = APIRouter(prefix="/auth", tags=["auth"])
+logger = logging.getLogger(__name__)
 
 
 @router.post("/register")
@@ -52,6 +55,22 @@ def login(body: LoginReq):
     if not verify_password(body.password, password_hash):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
+    # move bcrypt-era accounts onto argon2id the first time they log in;
+    # best effort, a failed upgrade must not fail a valid login
+    if password_needs_rehash(password_hash):
+        try:
+            # hash before borrowing a pooled connection
+            new_hash = hash_password(body.password)
+            with db_conn() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        "UPDATE users SET password_hash=%s WHERE email=%s AND password_hash=%s",
+                        (new_hash, body.email, password_hash),
+                    )
+        except Exception as e:
+            # error type only: driver messages can echo parameter values
+            logger.warning("password rehash skipped for client_id=%s: %s", client_id, type(e).__name__)
+
     token = create_access_token(subject=client_id, role=role, email=body.email)
     return {"access_token": token, "token_type": "bearer"}
 
@@ -1,20 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from pydantic import BaseModel
 from app.db import db_conn
 from app.deps import require_roles
-import json
-import requests
-import os
+from app.realtime import push_to_driver
+from app.utils.cache import TTLCache
+from app.utils.jsonb import to_jsonb
+import orjson
 import base64
+import binascii
 from typing import Any
 
 router = APIRouter(prefix="/driver", tags=["driver"])
 
-API_INTERNAL_NOTIFY = os.getenv(
-    "API_INTERNAL_NOTIFY",
-    "http://api-gateway:8000/internal/driver/{driver_id}/notify"
-)
-
 # ---------------- Schemas ----------------
 class DriverStatusUpdate(BaseModel):
     status: str  # "DELIVERED" or "FAILED" (you can add OUT_FOR_DELIVERY later)
@@ -32,17 +29,27 @@ def add_event(order_id: str, event_type: str, details: dict | None = None):
         with conn.cursor() as cur:
             cur.execute(
                 "INSERT INTO order_events(order_id, event_type, details) VALUES (%s,%s,%s::jsonb)",
-                (order_id, event_type, json.dumps(details)),
+                (order_id, event_type, to_jsonb(details)),
             )
         conn.commit()
 
+# email -> driver user id; only hits are cached, so a newly
+# created driver is never stuck behind a cached miss
+_driver_id_cache = TTLCache(ttl=600)
+
 def get_driver_user_id(email: str) -> str:
+    hit = _driver_id_cache.get(email)
+    if hit is not None:
+        return hit
+
     with db_conn() as conn:
         with conn.cursor() as cur:
             cur.execute("SELECT id FROM users WHERE email=%s AND role='driver'", (email,))
             row = cur.fetchone()
     if not row:
         raise HTTPException(status_code=401, detail="Driver not found")
+
+    _driver_id_cache.set(email, row[0])
     return row[0]
 
 def ensure_my_order(order_id: str, driver_id: str) -> dict:
@@ -66,16 +73,16 @@ def ensure_my_order(order_id: str, driver_id: str) -> dict:
 
     return {"id": row[0], "assigned_driver_id": row[1], "payload": row[2], "status": row[3]}
 
-def notify_driver(driver_id: str, payload: dict):
-    # best effort
-    try:
-        requests.post(
-            API_INTERNAL_NOTIFY.format(driver_id=driver_id),
-            json=payload,
-            timeout=2,
-        )
-    except Exception:
-        pass
+def notify_driver(tasks: BackgroundTasks, driver_id: str, payload: dict):
+    # best effort, after the response is sent: push_to_driver runs on the
+    # event loop as a background task, so the endpoint never waits on sockets
+    msg = {
+        "type": payload.get("type"),
+        "order_id": payload.get("order_id"),
+        "message": payload.get("message"),
+        "payload": payload.get("payload") or {},
+    }
+    tasks.add_task(push_to_driver, driver_id, msg)
 
 def normalize_payload(p: Any) -> dict:
     """
@@ -88,7 +95,7 @@ def normalize_payload(p: Any) -> dict:
         return p
     if isinstance(p, str):
         try:
-            v = json.loads(p)
+            v = orjson.loads(p)
             return v if isinstance(v, dict) else {}
         except Exception:
             return {}
@@ -106,15 +113,17 @@ def strip_data_url(b64: str) -> str:
             return parts[1].strip()
     return s
 
-def base64_size_ok(b64: str, max_bytes: int) -> bool:
+def base64_decoded_len(b64: str) -> int:
     """
-    base64 expands ~4/3, so decode size check.
+    Decoded size of a padded base64 string, computed from its length
+    (4 chars -> 3 bytes, minus padding) without decoding it.
     """
-    try:
-        raw = base64.b64decode(b64, validate=False)
-        return len(raw) <= max_bytes
-    except Exception:
-        return False
+    b64 = b64.strip()
+    pad = 2 if b64.endswith("==") else 1 if b64.endswith("=") else 0
+    return (len(b64) * 3) // 4 - pad
+
+def base64_size_ok(b64: str, max_bytes: int) -> bool:
+    return base64_decoded_len(b64) <= max_bytes
 
 # ---------------- APIs ----------------
 
@@ -185,7 +194,12 @@ def manifest_today(user=Depends(require_roles("driver"))):
     return {"driver_id": driver_id, "orders": items}
 
 @router.post("/orders/{order_id}/status")
-def update_delivery(order_id: str, body: DriverStatusUpdate, user=Depends(require_roles("driver"))):
+def update_delivery(
+    order_id: str,
+    body: DriverStatusUpdate,
+    tasks: BackgroundTasks,
+    user=Depends(require_roles("driver")),
+):
     if body.status not in ("DELIVERED", "FAILED"):
         raise HTTPException(status_code=400, detail="Invalid status")
 
@@ -210,6 +224,7 @@ def update_delivery(order_id: str, body: DriverStatusUpdate, user=Depends(requir
     add_event(order_id, body.status, {"driver_id": driver_id, "reason": body.reason})
 
     notify_driver(
+        tasks,
         driver_id,
         {"type": "STATUS_UPDATED", "order_id": order_id, "payload": {"status": body.status}},
     )
@@ -217,7 +232,12 @@ def update_delivery(order_id: str, body: DriverStatusUpdate, user=Depends(requir
 
 # ✅ Proof upload (photo/signature)
 @router.post("/orders/{order_id}/proof")
-def upload_proof(order_id: str, body: ProofUpload, user=Depends(require_roles("driver"))):
+def upload_proof(
+    order_id: str,
+    body: ProofUpload,
+    tasks: BackgroundTasks,
+    user=Depends(require_roles("driver")),
+):
     if body.proof_type not in ("photo", "signature"):
         raise HTTPException(status_code=400, detail="Invalid proof_type")
 
@@ -231,9 +251,15 @@ def upload_proof(order_id: str, body: ProofUpload, user=Depends(require_roles("d
     if not b64 or len(b64) < 50:
         raise HTTPException(status_code=400, detail="Proof data too small")
 
+    # cheap length check first, so oversized uploads are never decoded
     if not base64_size_ok(b64, max_bytes=max_bytes):
         raise HTTPException(status_code=400, detail=f"Proof too large (max {max_bytes} bytes)")
 
+    try:
+        base64.b64decode(b64, validate=True)
+    except binascii.Error:
+        raise HTTPException(status_code=400, detail="Invalid base64 proof data")
+
     add_event(
         order_id,
         "PROOF_UPLOADED",
@@ -246,6 +272,7 @@ def upload_proof(order_id: str, body: ProofUpload, user=Depends(require_roles("d
     )
 
     notify_driver(
+        tasks,
         driver_id,
         {"type": "PROOF_UPLOADED", "order_id": order_id, "payload": {"proof_type": body.proof_type}},
     )
@@ -1,13 +1,12 @@
 import os
-import requests
 from fastapi import APIRouter
 
+from app.utils.http import get_json_cached
+
 router = APIRouter(prefix="/internal/cms", tags=["internal-cms"])
 
 CMS_INTERNAL = os.getenv("CMS_INTERNAL", "http://cms-soap:9000")
 
 @router.get("/last")
 def cms_last():
-    r = requests.get(f"{CMS_INTERNAL}/last", timeout=3)
-    r.raise_for_status()
-    return r.json()
\ No newline at end of file
+    return get_json_cached(f"{CMS_INTERNAL}/last")
\ No newline at end of file
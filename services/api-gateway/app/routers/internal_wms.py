@@ -1,11 +1,11 @@
-import os, requests
+import os
 from fastapi import APIRouter
 
+from app.utils.http import get_json_cached
+
 router = APIRouter(prefix="/internal/wms", tags=["internal-wms"])
 WMS_INTERNAL = os.getenv("WMS_INTERNAL", "http://wms-tcp:9201")
 
 @router.get("/last")
 def wms_last():
-    r = requests.get(f"{WMS_INTERNAL}/last", timeout=3)
-    r.raise_for_status()
-    return r.json()
\ No newline at end of file
+    return get_json_cached(f"{WMS_INTERNAL}/last")
\ No newline at end of file
@@ -1,64 +1,69 @@
 from fastapi import APIRouter, Depends, HTTPException
 from app.db import db_conn
 from app.deps import get_current_user
-import json
+from app.utils.jsonb import to_jsonb
+import itertools
 import time
-from datetime import datetime, timezone
 
 router = APIRouter(prefix="/orders", tags=["orders"])
 
-def gen_order_id() -> str:
-    return f"ORD-{int(time.time() * 1000)}"
+# C-level counter: next() is atomic under the GIL, so concurrent requests in the
+# same millisecond still get distinct ids without a lock
+_order_seq = itertools.count()
 
-def add_event(order_id: str, event_type: str, details: dict | None = None):
-    details = details or {}
-    with db_conn() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                "INSERT INTO order_events(order_id, event_type, details) VALUES (%s,%s,%s::jsonb)",
-                (order_id, event_type, json.dumps(details)),
-            )
-        conn.commit()
+def gen_order_id(now_ms: int) -> str:
+    return f"ORD-{now_ms}{next(_order_seq) % 1000:03d}"
+
+def iso_ms(ms: int) -> str:
+    # same output as datetime.fromtimestamp(ms/1000, tz=utc).isoformat(timespec="milliseconds")
+    # without building a datetime per row
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(ms // 1000)) + f".{ms % 1000:03d}+00:00"
+
+# order row, its outbox row and its audit events in one statement
+# (one round trip, one commit)
+CREATE_ORDER_SQL = """
+WITH o AS (
+    INSERT INTO orders (id, client_id, payload, status, retry_count, created_at, updated_at)
+    VALUES (%(order_id)s, %(client_id)s, %(payload)s::jsonb, 'NEW', 0, %(created_ms)s, NOW())
+    RETURNING id
+), ob AS (
+    INSERT INTO outbox (aggregate_type, aggregate_id, event_type, payload)
+    SELECT 'order', o.id, 'ORDER_CREATED', jsonb_build_object('order_id', o.id)
+    FROM o
+)
+INSERT INTO order_events (order_id, event_type, details)
+SELECT o.id, e.event_type, e.details
+FROM o, (VALUES
+    (1, 'CREATED', jsonb_build_object('client_id', %(client_id)s::text)),
+    (2, 'OUTBOX_ENQUEUED', jsonb_build_object('event_type', 'ORDER_CREATED'))
+) AS e(seq, event_type, details)
+ORDER BY e.seq
+"""
 
 @router.post("")
-@router.post("/")
 def create_order(payload: dict, user=Depends(get_current_user)):
     client_id = user.get("client_id")
     if not client_id:
         raise HTTPException(status_code=401, detail="client_id missing in token")
 
-    order_id = gen_order_id()
+    # one clock read for both the id and created_at
     created_ms = int(time.time() * 1000)
+    order_id = gen_order_id(created_ms)
 
     with db_conn() as conn:
         with conn.cursor() as cur:
             # orders.created_at BIGINT (epoch ms)
-            cur.execute(
-                """
-                INSERT INTO orders (id, client_id, payload, status, retry_count, created_at, updated_at)
-                VALUES (%s, %s, %s::jsonb, %s, 0, %s, NOW())
-                """,
-                (order_id, client_id, json.dumps(payload), "NEW", created_ms),
-            )
-
             # outbox schema: (aggregate_type, aggregate_id, event_type, payload)
             cur.execute(
-                """
-                INSERT INTO outbox (aggregate_type, aggregate_id, event_type, payload)
-                VALUES (%s, %s, %s, %s::jsonb)
-                """,
-                ("order", order_id, "ORDER_CREATED", json.dumps({"order_id": order_id})),
+                CREATE_ORDER_SQL,
+                {
+                    "order_id": order_id,
+                    "client_id": client_id,
+                    "payload": to_jsonb(payload),
+                    "created_ms": created_ms,
+                },
             )
 
-        conn.commit()
-
-    # audit trail (optional but good)
-    try:
-        add_event(order_id, "CREATED", {"client_id": client_id})
-        add_event(order_id, "OUTBOX_ENQUEUED", {"event_type": "ORDER_CREATED"})
-    except Exception:
-        pass
-
     # UI-friendly: order is in DB, and outbox will publish soon
     return {"order_id": order_id, "status": "NEW"}
 
@@ -81,18 +86,16 @@ def my_orders(user=Depends(get_current_user)):
             )
             rows = cur.fetchall()
 
-    orders = [
-        {
+    orders = []
+    for r in rows:
+        created_at = int(r[4]) if r[4] is not None else None
+        orders.append({
             "id": r[0],
             "client_id": r[1],
             "payload": r[2],
             "status": r[3],
-            "created_at": int(r[4]) if r[4] is not None else None,
-            "created_at_iso": datetime.fromtimestamp(int(r[4]) / 1000, tz=timezone.utc)
-            .isoformat(timespec="milliseconds")
-            if r[4] is not None else None,
-        }
-        for r in rows
-    ]
+            "created_at": created_at,
+            "created_at_iso": iso_ms(created_at) if created_at is not None else None,
+        })
 
     return {"client_id": client_id, "orders": orders}
\ No newline at end of file
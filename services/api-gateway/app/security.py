@@ -1,11 +1,49 @@
+import hashlib
+import hmac
+import secrets
 from datetime import datetime, timedelta, timezone
 
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
-from app.config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.config import (
+    SECRET_KEY,
+    ALGORITHM,
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    BCRYPT_ROUNDS,
+    ARGON2_TIME_COST,
+    ARGON2_MEMORY_COST,
+    ARGON2_PARALLELISM,
+)
+
+# the one CryptContext for the gateway: new hashes are argon2id, existing bcrypt
+# hashes keep verifying and are flagged by needs_update() so login can rehash them
+pwd_context = CryptContext(
+    schemes=["argon2", "bcrypt"],
+    deprecated="auto",
+    argon2__type="ID",
+    argon2__time_cost=ARGON2_TIME_COST,
+    argon2__memory_cost=ARGON2_MEMORY_COST,
+    argon2__parallelism=ARGON2_PARALLELISM,
+    bcrypt__rounds=BCRYPT_ROUNDS,
+)
+
+# load the hash backends at import instead of on the first login request
+pwd_context.handler("argon2").get_backend()
+pwd_context.handler("bcrypt").get_backend()
+
+
+# (password, stored hash) pairs that already verified, so repeat logins skip
+# the KDF. Keys are HMACs under a per-process secret, never the password itself;
+# the stored hash is part of the key, so a password change just misses.
+VERIFY_CACHE_MAX = 10000
+_verify_secret = secrets.token_bytes(32)
+_verified: set[bytes] = set()
+
+
+def _verify_key(password: str, password_hash: str) -> bytes:
+    msg = password.encode("utf-8") + b"|" + password_hash.encode("utf-8")
+    return hmac.new(_verify_secret, msg, hashlib.sha256).digest()
 
 
 def _pw_bytes_len(pw: str) -> int:
@@ -34,7 +72,23 @@ def verify_password(password: str, password_hash: str) -> bool:
     if _pw_bytes_len(password) > 72:
         return False
 
-    return pwd_context.verify(password, password_hash)
+    key = _verify_key(password, password_hash)
+    if key in _verified:
+        return True
+
+    # only successes are cached; a wrong password always pays the full hash cost
+    if not pwd_context.verify(password, password_hash):
+        return False
+
+    if len(_verified) >= VERIFY_CACHE_MAX:
+        _verified.clear()
+    _verified.add(key)
+    return True
+
+
+def password_needs_rehash(password_hash: str) -> bool:
+    # true for legacy bcrypt hashes and for argon2 hashes made with older params
+    return pwd_context.needs_update(password_hash)
 
 
 def create_access_token(subject: str, role: str, email: str, expires_minutes: int | None = None) -> str:
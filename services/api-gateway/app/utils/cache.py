@@ -0,0 +1,25 @@
+# app/utils/cache.py
+import time
+from typing import Any, Hashable
+
+class TTLCache:
+    """
+    Small per-process dict cache: entries expire after `ttl` seconds and the
+    whole dict is dropped once it reaches `max_entries` (no LRU bookkeeping).
+    """
+    def __init__(self, ttl: float, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data: dict[Hashable, tuple[float, Any]] = {}
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        hit = self._data.get(key)
+        if hit and hit[0] > time.monotonic():
+            return hit[1]
+        return default
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None):
+        # `ttl` overrides the default for this entry (e.g. capped by a token's exp)
+        if len(self._data) >= self.max_entries:
+            self._data.clear()
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
@@ -1,6 +1,6 @@
 # app/utils/events.py
-import json
 from app.db import db_conn
+from app.utils.jsonb import to_jsonb
 
 def log_event(order_id: str, event_type: str, details: dict | None = None):
     details = details or {}
@@ -8,6 +8,6 @@ def log_event(order_id: str, event_type: str, details: dict | None = None):
         with conn.cursor() as cur:
             cur.execute(
                 "INSERT INTO order_events (order_id, event_type, details) VALUES (%s,%s,%s)",
-                (order_id, event_type, json.dumps(details)),
+                (order_id, event_type, to_jsonb(details)),
             )
             conn.commit()
\ No newline at end of file
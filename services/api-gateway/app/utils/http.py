@@ -0,0 +1,30 @@
+# app/utils/http.py
+import threading
+from typing import Any
+
+import requests
+
+from app.utils.cache import TTLCache
+
+_local = threading.local()
+
+def http_session() -> requests.Session:
+    # one keep-alive Session per threadpool thread: reuses TCP connections to
+    # the mocks instead of a new handshake per call (Session isn't thread-safe)
+    s = getattr(_local, "session", None)
+    if s is None:
+        s = _local.session = requests.Session()
+    return s
+
+# url -> json; the consoles poll /last every ~1.5s per open tab
+_json_cache = TTLCache(ttl=1.0, max_entries=1000)
+
+def get_json_cached(url: str, ttl: float = 1.0, timeout: float = 3) -> Any:
+    hit = _json_cache.get(url)
+    if hit is not None:
+        return hit
+    r = http_session().get(url, timeout=timeout)
+    r.raise_for_status()
+    data = r.json()
+    _json_cache.set(url, data, ttl=ttl)
+    return data
@@ -0,0 +1,16 @@
+# app/utils/jsonb.py
+import json
+from typing import Any
+
+import orjson
+
+def to_jsonb(obj: Any) -> str:
+    """
+    Encode a value for a %s::jsonb parameter. orjson is the fast path; it
+    rejects integers beyond 64 bits (and non-str keys), which stdlib json and
+    Postgres jsonb accept, so client-supplied payloads fall back to json.dumps.
+    """
+    try:
+        return orjson.dumps(obj).decode()
+    except orjson.JSONEncodeError:
+        return json.dumps(obj)
@@ -1,7 +1,31 @@
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import ORJSONResponse
 from datetime import datetime, timezone
+from lxml import etree
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
+
+# compiled once; match on local-name() so both bare and namespaced envelopes work
+_XP_OP = etree.XPath("/*[local-name()='Envelope']/*[local-name()='Body']/*[1]")
+
+# operation child localname -> LAST key
+_FIELDS = {"OrderId": "order_id", "ClientId": "client_id"}
+
+# one parser for all requests (handler runs on the event loop thread only);
+# no entity expansion / network access -> no XXE
+_PARSER = etree.XMLParser(resolve_entities=False, no_network=True, huge_tree=False)
+
+def extract_fields(root) -> dict:
+    """
+    One linear pass over the operation element's children.
+    """
+    found = {}
+    for op in _XP_OP(root):
+        for child in op.iterchildren(tag=etree.Element):
+            key = _FIELDS.get(etree.QName(child).localname)
+            if key:
+                found[key] = (child.text or "").strip() or None
+    return found
 
 LAST = {
     "seen_at": None,
@@ -11,26 +35,9 @@ LAST = {
     "response_xml": None,
 }
 
-@app.get("/health")
-def health():
-    return {"status": "ok"}
-
-@app.post("/soap")
-async def soap(request: Request):
-    xml = (await request.body()).decode("utf-8", errors="ignore")
-
-    # very simple extract (optional)
-    def extract(tag: str):
-      start = xml.find(f"<{tag}>")
-      end = xml.find(f"</{tag}>")
-      if start == -1 or end == -1: return None
-      start += len(tag) + 2
-      return xml[start:end].strip()
+_HEALTH_BODY = b'{"status":"ok"}'
 
-    order_id = extract("OrderId")
-    client_id = extract("ClientId")
-
-    resp = """<?xml version="1.0"?>
+CREATE_ORDER_RESPONSE = """<?xml version="1.0"?>
 <Envelope>
   <Body>
     <CreateOrderResponse>
@@ -39,16 +46,36 @@ async def soap(request: Request):
   </Body>
 </Envelope>
 """
+_CREATE_ORDER_RESPONSE_BYTES = CREATE_ORDER_RESPONSE.encode("utf-8")
+
+@app.get("/health")
+def health():
+    return Response(content=_HEALTH_BODY, media_type="application/json")
+
+@app.post("/soap")
+async def soap(request: Request):
+    raw = await request.body()
+    xml = raw.decode("utf-8", errors="ignore")
+
+    # parse bytes directly (libxml2); malformed bodies just yield no ids
+    try:
+        fields = extract_fields(etree.fromstring(raw, _PARSER))
+    except etree.XMLSyntaxError:
+        fields = {}
+
+    order_id = fields.get("order_id")
+    client_id = fields.get("client_id")
 
     LAST.update({
         "seen_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
         "order_id": order_id,
         "client_id": client_id,
         "request_xml": xml,
-        "response_xml": resp,
+        "response_xml": CREATE_ORDER_RESPONSE,
     })
 
-    return resp
+    # raw XML bytes; returning the str would JSON-encode it
+    return Response(content=_CREATE_ORDER_RESPONSE_BYTES, media_type="text/xml")
 
 @app.get("/last")
 def last():
@@ -1,5 +1,6 @@
 import time
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
+from fastapi.responses import ORJSONResponse
 from datetime import datetime, timezone
 
 LAST = {
@@ -8,11 +9,13 @@ LAST = {
     "request_json": None,
     "response_json": None,
 }
-app = FastAPI(title="ROS REST Mock")
+app = FastAPI(title="ROS REST Mock", default_response_class=ORJSONResponse)
+
+_HEALTH_BODY = b'{"status":"ok"}'
 
 @app.get("/health")
 def health():
-    return {"status": "ok"}
+    return Response(content=_HEALTH_BODY, media_type="application/json")
 
 
 @app.post("/optimize-route")
@@ -2,6 +2,7 @@ import socket
 import threading
 from datetime import datetime, timezone
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 import uvicorn
 
 HOST = "0.0.0.0"
@@ -14,7 +15,7 @@ LAST = {
     "reply": None,
 }
 
-app = FastAPI(title="WMS Mock (TCP + HTTP)")
+app = FastAPI(title="WMS Mock (TCP + HTTP)", default_response_class=ORJSONResponse)
 
 @app.get("/last")
 def last():
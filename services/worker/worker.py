@@ -1,12 +1,16 @@
-import json
 import os
 import socket
 import sys
+import threading
 import time
+from contextlib import contextmanager
 from typing import Any, Dict, Optional, Tuple, List
+from xml.sax.saxutils import escape
 
+import orjson
 import pika
 import psycopg2
+from psycopg2.pool import ThreadedConnectionPool
 import requests
 
 # ---------------- Retry tuning ----------------
@@ -27,14 +31,64 @@ QUEUE_MAIN = "order.created"
 QUEUE_RETRY = "order.created.retry"
 QUEUE_DLQ = "order.created.dlq"
 
+# orders in these states are never re-run by process_order
+DONE_STATUSES = frozenset(("READY_FOR_DRIVER", "DELIVERED", "FAILED", "DLQ"))
+
 MAX_RETRIES = int(os.getenv("MAX_RETRIES", "5"))
+PREFETCH_COUNT = int(os.getenv("PREFETCH_COUNT", "1"))
+# each consumer thread owns its own rabbit connection/channel
+CONSUMER_THREADS = max(1, int(os.getenv("CONSUMER_THREADS", "1")))
 DEMO_DELAYS = os.getenv("DEMO_DELAYS", "true").lower() in ("1", "true", "yes", "y")
+# per-message info lines; warnings/errors/retries are always printed
+VERBOSE_LOGS = os.getenv("VERBOSE_LOGS", "false").lower() in ("1", "true", "yes", "y")
+
+# ---------------- HTTP ----------------
+_http_local = threading.local()
+
+def http_session() -> requests.Session:
+    # keep-alive Session per thread (consumer threads + outbox loop each get one)
+    s = getattr(_http_local, "session", None)
+    if s is None:
+        s = _http_local.session = requests.Session()
+    return s
 
 # ---------------- DB ----------------
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+# assign_driver_if_missing holds a connection while pick_driver_id borrows another,
+# so each consumer thread can need two at once
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", str(CONSUMER_THREADS * 2 + 2)))
+
+_db_pool: Optional[ThreadedConnectionPool] = None
+_db_pool_lock = threading.Lock()
+
+def _get_db_pool() -> ThreadedConnectionPool:
+    global _db_pool
+    if _db_pool is None:
+        if not DATABASE_URL:
+            raise RuntimeError("DATABASE_URL not set")
+        with _db_pool_lock:
+            if _db_pool is None:
+                _db_pool = ThreadedConnectionPool(DB_POOL_MIN, DB_POOL_MAX, DATABASE_URL)
+    return _db_pool
+
+@contextmanager
 def db_conn():
-    if not DATABASE_URL:
-        raise RuntimeError("DATABASE_URL not set")
-    return psycopg2.connect(DATABASE_URL)
+    # borrow a pooled connection: commit on success, rollback on error, then hand it back
+    pool = _get_db_pool()
+    conn = pool.getconn()
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        if not conn.closed:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                pass
+        raise
+    finally:
+        # don't return a connection that died mid-use
+        pool.putconn(conn, close=bool(conn.closed))
 
 def _table_exists(conn, table_name: str) -> bool:
     with conn.cursor() as cur:
@@ -94,7 +148,7 @@ def set_status(
 
     # best-effort push to gateway for WS/UI
     try:
-        requests.post(
+        http_session().post(
             API_INTERNAL_STATUS.format(order_id=order_id),
             json={"status": status},
             timeout=3,
@@ -105,7 +159,7 @@ def set_status(
 def notify_driver(driver_id: str, msg: dict):
     # best-effort (never crash worker)
     try:
-        requests.post(
+        http_session().post(
             API_INTERNAL_NOTIFY.format(driver_id=driver_id),
             json=msg,
             timeout=2,
@@ -126,7 +180,7 @@ def add_event(order_id: str, event_type: str, details: Optional[Dict[str, Any]]
             with conn.cursor() as cur:
                 cur.execute(
                     "INSERT INTO order_events(order_id, event_type, details) VALUES (%s,%s,%s::jsonb)",
-                    (order_id, event_type, json.dumps(details)),
+                    (order_id, event_type, orjson.dumps(details).decode()),
                 )
                 conn.commit()
     except Exception as e:
@@ -157,12 +211,12 @@ def call_cms_soap(order_id: str) -> str:
 <Envelope>
   <Body>
     <CreateOrder>
-      <OrderId>{order_id}</OrderId>
+      <OrderId>{escape(order_id)}</OrderId>
     </CreateOrder>
   </Body>
 </Envelope>
 """
-    r = requests.post(
+    r = http_session().post(
         CMS_URL,
         data=xml.encode("utf-8"),
         headers={"Content-Type": "text/xml"},
@@ -175,7 +229,7 @@ def call_ros_rest(order_id: str) -> dict:
     if not ROS_URL:
         raise RuntimeError("ROS_URL not set")
 
-    r = requests.post(ROS_URL, json={"order_id": order_id}, timeout=5)
+    r = http_session().post(ROS_URL, json={"order_id": order_id}, timeout=5)
     r.raise_for_status()
     return r.json()
 
@@ -222,6 +276,9 @@ def rabbit_get_channel():
     while True:
         try:
             conn, ch = rabbit_connect()
+            # declare on every fresh connection: the broker may have been
+            # recreated without its queues, and publishes to a missing queue
+            # on the default exchange are dropped silently
             declare_queues(ch)
             return conn, ch
         except Exception as e:
@@ -271,16 +328,14 @@ def publish_dlq(channel, body: bytes, properties: pika.BasicProperties, reason:
     headers["x-dlq-reason"] = (reason or "")[:200]
     publish_to_queue(channel, QUEUE_DLQ, body, properties, headers)
 
-def safe_extract_order_id(body: bytes) -> str:
-    data = json.loads(body.decode("utf-8"))
+def safe_extract_order_id(data: Dict[str, Any]) -> str:
     return data["order_id"]
 
-def safe_extract_event_id(body: bytes, properties: pika.BasicProperties) -> Optional[str]:
+def safe_extract_event_id(data: Dict[str, Any], properties: pika.BasicProperties) -> Optional[str]:
     """
     Prefer JSON field 'event_id'. If missing, fallback to correlation_id (outbox_id).
     """
     try:
-        data = json.loads(body.decode("utf-8"))
         ev = data.get("event_id")
         if ev:
             return str(ev)
@@ -364,7 +419,7 @@ def mark_ready_for_driver(order_id: str):
 def process_order(order_id: str):
     st = get_status(order_id)
 
-    if st in ("READY_FOR_DRIVER", "DELIVERED", "FAILED", "DLQ"):
+    if st in DONE_STATUSES:
         print(f"[SKIP] order={order_id} already done status={st}")
         add_event(order_id, "SKIP_ALREADY_DONE", {"status": st})
         return
@@ -405,9 +460,8 @@ def process_order(order_id: str):
             updated_at = NOW()
             WHERE id=%s
             """,
-            (json.dumps(route), order_id),
+            (orjson.dumps(route).decode(), order_id),
         )
-    conn.commit()
 
     add_event(order_id, "ROUTE_SAVED", {"route": route})
 
@@ -445,9 +499,12 @@ def outbox_fetch_batch(conn, limit: int = 50) -> List[Tuple[int, str, str, Dict[
         )
         return cur.fetchall()
 
-def outbox_delete(conn, outbox_id: int):
+def outbox_delete(conn, outbox_ids: List[int]):
+    # one statement for the whole batch instead of one round trip per row
+    if not outbox_ids:
+        return
     with conn.cursor() as cur:
-        cur.execute("DELETE FROM outbox WHERE id=%s", (outbox_id,))
+        cur.execute("DELETE FROM outbox WHERE id = ANY(%s)", (outbox_ids,))
 
 def run_outbox_publisher():
     print("[OUTBOX] starting outbox publisher loop...")
@@ -475,29 +532,30 @@ def run_outbox_publisher():
                     time.sleep(1)
                     continue
 
+                published: List[int] = []
+                # one properties object per batch; only correlation_id changes
+                props = pika.BasicProperties(delivery_mode=2, content_type="application/json")
                 for outbox_id, agg_type, order_id, payload in rows:
                     # event_id = outbox_id (stable) -> supports idempotency
+                    event_id = str(outbox_id)
                     msg = {
                         "order_id": str(order_id),
-                        "event_id": str(outbox_id),
+                        "event_id": event_id,
                         "aggregate_type": agg_type,
                         "payload": payload,
                     }
-                    body = json.dumps(msg).encode("utf-8")
+                    body = orjson.dumps(msg)
+                    props.correlation_id = event_id
 
                     try:
                         ch.basic_publish(
                             exchange="",
                             routing_key=QUEUE_MAIN,
                             body=body,
-                            properties=pika.BasicProperties(
-                                delivery_mode=2,
-                                content_type="application/json",
-                                correlation_id=str(outbox_id),
-                            ),
+                            properties=props,
                         )
 
-                        outbox_delete(conn_db, outbox_id)
+                        published.append(outbox_id)
 
                         # optional: mark order queued + event
                         try:
@@ -506,10 +564,14 @@ def run_outbox_publisher():
                         except Exception:
                             pass
 
-                        print(f"[OUTBOX] published order={order_id} outbox_id={outbox_id}")
+                        if VERBOSE_LOGS:
+                            print(f"[OUTBOX] published order={order_id} outbox_id={outbox_id}")
 
                     except Exception as e:
                         # if publish fails, do NOT delete row -> will retry later
+                        # (rows already published in this batch are still removed)
+                        outbox_delete(conn_db, published)
+                        published.clear()
                         conn_db.commit()
                         print(f"[OUTBOX][WARN] publish failed outbox_id={outbox_id} err={e}")
 
@@ -520,6 +582,9 @@ def run_outbox_publisher():
                             pass
                         conn_rabbit, ch = rabbit_get_channel()
 
+                if published:
+                    print(f"[OUTBOX] published batch={len(published)}")
+                outbox_delete(conn_db, published)
                 conn_db.commit()
 
         except Exception as loop_err:
@@ -534,15 +599,18 @@ def run_consumer():
     while True:
         conn, ch = rabbit_get_channel()
         try:
-            ch.basic_qos(prefetch_count=1)
+            ch.basic_qos(prefetch_count=PREFETCH_COUNT)
 
             def on_msg(channel, method, properties, body):
                 order_id = None
                 try:
-                    order_id = safe_extract_order_id(body)
-                    event_id = safe_extract_event_id(body, properties)
+                    # decode once; both extractors read from the same dict
+                    data = orjson.loads(body)
+                    order_id = safe_extract_order_id(data)
+                    event_id = safe_extract_event_id(data, properties)
 
-                    print(f"[INFO] received order={order_id} event_id={event_id}")
+                    if VERBOSE_LOGS:
+                        print(f"[INFO] received order={order_id} event_id={event_id}")
 
                     # idempotency: if same event already applied -> ack + skip
                     if order_id and event_id and already_processed(order_id, event_id):
@@ -557,7 +625,8 @@ def run_consumer():
                         mark_processed(order_id, event_id)
 
                     channel.basic_ack(delivery_tag=method.delivery_tag)
-                    print(f"[OK] done order={order_id}")
+                    if VERBOSE_LOGS:
+                        print(f"[OK] done order={order_id}")
 
                 except Exception as e:
                     retries = get_retry_count(properties)
@@ -619,6 +688,12 @@ def main():
         mode = sys.argv[1].strip().lower()
 
     if mode in ("consume", "worker"):
+        threads = [
+            threading.Thread(target=run_consumer, name=f"consumer-{i}")
+            for i in range(CONSUMER_THREADS - 1)
+        ]
+        for t in threads:
+            t.start()
         run_consumer()
     elif mode in ("outbox", "publisher"):
         run_outbox_publisher()